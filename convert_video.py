@@ -6,13 +6,529 @@ Converts video files to different formats and resolutions
 
 import ffmpeg
 import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import subprocess
 import sys
+import tempfile
+import threading
+from collections import deque
 from pathlib import Path
 
+from utils import CACHE_DIR, ensure_dir
+
+try:
+    import cpufeature
+except ImportError:
+    cpufeature = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Hardware encoders for each software codec, in order of preference for "auto"
+HW_ENCODERS = {
+    'nvenc': {'libx264': 'h264_nvenc', 'libx265': 'hevc_nvenc'},
+    'qsv': {'libx264': 'h264_qsv', 'libx265': 'hevc_qsv'},
+    'vt': {'libx264': 'h264_videotoolbox', 'libx265': 'hevc_videotoolbox'},
+    'vaapi': {'libx264': 'h264_vaapi', 'libx265': 'hevc_vaapi'},
+}
+
+# Input options that keep decoded frames on the device
+HW_INPUT_OPTIONS = {
+    'nvenc': {'hwaccel': 'cuda', 'hwaccel_output_format': 'cuda'},
+    'qsv': {'hwaccel': 'qsv', 'hwaccel_output_format': 'qsv'},
+    'vt': {'hwaccel': 'videotoolbox'},
+    'vaapi': {'hwaccel': 'vaapi', 'hwaccel_output_format': 'vaapi'},
+}
+
+# Scale filters that operate on device frames (VideoToolbox frames come back to the CPU)
+HW_SCALE_FILTERS = {
+    'nvenc': 'scale_npp',
+    'qsv': 'scale_qsv',
+    'vt': 'scale',
+    'vaapi': 'scale_vaapi',
+}
+
+# Arguments uploading the test frame for backends whose encoders only take hardware frames
+HW_TEST_ARGS = {
+    'qsv': ['-init_hw_device', 'qsv=hw', '-filter_hw_device', 'hw', '-vf', 'format=nv12,hwupload=extra_hw_frames=16'],
+    'vaapi': ['-init_hw_device', 'vaapi=hw', '-filter_hw_device', 'hw', '-vf', 'format=nv12,hwupload'],
+}
+HW_ENCODER_OPTIONS = {
+    'nvenc': {'preset': 'p4', 'rc': 'vbr'},
+}
+
+# libx264/libx265 instruction sets for CPUs where the wider extensions are a net loss.
+# Zen1 executes 256-bit AVX2 as two 128-bit halves and has slow BMI2/FMA3.
+ASM_MASKS = {
+    'zen1': 'mmx2,sse2,ssse3,sse4,avx',
+    'zen2': 'mmx2,sse2,ssse3,sse4,avx,avx2',
+}
+
+# Output heights for the rungs of a resolution ladder
+LADDER_RUNGS = {
+    '2160p': 2160,
+    '1440p': 1440,
+    '1080p': 1080,
+    '720p': 720,
+    '480p': 480,
+    '360p': 360,
+    '240p': 240,
+}
+
+# Encoders used to re-encode the lead-in of a clip, by source video codec
+SMART_CUT_ENCODERS = {
+    'h264': 'libx264',
+    'hevc': 'libx265',
+}
+
+# Software encoders whose output should be 8-bit 4:2:0 for playback compatibility
+YUV420_ENCODERS = ('libx264', 'libvpx')
+
+# Paths substituted into cached ffmpeg command lines
+INPUT_PLACEHOLDER = '__IN__'
+OUTPUT_PLACEHOLDER = '__OUT__'
+
+# Lines of "ffmpeg -progress" output, e.g. "out_time_us=1234567"
+PROGRESS_LINE = re.compile(r'^[a-z0-9_]+=\S*$')
+
+# Cores reaching this share of the highest max frequency count as performance cores
+P_CORE_FREQ_RATIO = 0.9
+
+# ffmpeg log lines kept for error messages
+PROGRESS_LOG_LINES = 100
+
+# Raw H.264/H.265 (Annex B) elementary streams, which carry no timestamps to seek by
+ANNEXB_EXTENSIONS = ('.h264', '.264', '.avc', '.h265', '.265', '.hevc')
+
+# Clips starting this close (seconds) after a keyframe are cut there with stream copy
+KEYFRAME_TOLERANCE = 0.04
+
+# Codecs each container can hold without re-encoding
+COMPATIBLE_CODECS = {
+    'mp4': {'h264', 'hevc', 'av1', 'aac', 'mp3', 'mov_text'},
+    'mkv': {'h264', 'hevc', 'av1', 'vp8', 'vp9', 'aac', 'mp3', 'opus', 'vorbis', 'flac',
+            'subrip', 'ass'},
+    'webm': {'vp8', 'vp9', 'av1', 'opus', 'vorbis', 'webvtt'},
+    'avi': {'h264', 'mpeg4', 'mp3'},
+}
+
+# Codec names reported by ffprobe for each encoder
+ENCODER_CODECS = {
+    'libx264': 'h264',
+    'libx265': 'hevc',
+    'libvpx': 'vp8',
+    'libvpx-vp9': 'vp9',
+    'libaom-av1': 'av1',
+    'libsvtav1': 'av1',
+    'libmp3lame': 'mp3',
+    'libopus': 'opus',
+    'libvorbis': 'vorbis',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def available_encoders():
+    """Return the set of encoder names supported by the installed ffmpeg"""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return frozenset()
+
+    encoders = set()
+    for line in result.stdout.splitlines():
+        # Encoder lines look like: " V....D libx264    libx264 H.264 / AVC ..."
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in 'VAS':
+            encoders.add(parts[1])
+    return frozenset(encoders)
+
+
+def scale_filter(stream, width, height, encoder):
+    """
+    Resize a software-decoded video stream
+
+    The yuv420p conversion follows the scaler in the same filter chain, so
+    format negotiation folds both into a single swscale pass instead of two
+    full-frame passes. zscale is not used, as it rejects RGB input (PNG, qtrle).
+    """
+    stream = ffmpeg.filter(stream, 'scale', width, height, flags='bicubic')
+
+    if encoder in YUV420_ENCODERS:
+        stream = ffmpeg.filter(stream, 'format', 'yuv420p')
+    return stream
+
+
+def cached_probe(filename, **kwargs):
+    """
+    Run ffprobe like ffmpeg.probe(), caching the result on disk
+
+    Results are keyed by path, modification time, size and probe options, so
+    an unchanged file is never probed twice. The JSON is parsed with orjson
+    when installed.
+
+    Raises:
+        ffmpeg.Error: If ffprobe fails
+    """
+    stat = os.stat(filename)
+    key = json.dumps([os.path.abspath(filename), stat.st_mtime_ns, stat.st_size, kwargs],
+                     sort_keys=True)
+    digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    cache_file = CACHE_DIR / "probe" / f"{digest}.json"
+
+    loads = orjson.loads if orjson is not None else json.loads
+
+    try:
+        return loads(cache_file.read_bytes())
+    except (OSError, ValueError):
+        pass  # Not cached yet or corrupt entry
+
+    args = ['ffprobe', '-show_format', '-show_streams', '-of', 'json']
+    for k, v in kwargs.items():
+        args.append(f'-{k}')
+        if v is not None:
+            args.append(str(v))
+    args.append(filename)
+
+    result = subprocess.run(args, capture_output=True)
+    if result.returncode != 0:
+        raise ffmpeg.Error('ffprobe', result.stdout, result.stderr)
+
+    try:
+        ensure_dir(cache_file.parent)
+        cache_file.write_bytes(result.stdout)
+    except OSError:
+        pass
+
+    return loads(result.stdout)
+
+
+def probe_duration(input_file):
+    """Return the duration of a media file in seconds, or None if unknown"""
+    try:
+        return float(cached_probe(input_file)['format']['duration'])
+    except (KeyError, ValueError, ffmpeg.Error):
+        return None
+
+
+def parse_cpu_list(text):
+    """Parse a Linux CPU list such as "0-7,16" into a set of CPU numbers"""
+    cpus = set()
+    for part in text.strip().split(','):
+        if '-' in part:
+            first, last = map(int, part.split('-'))
+            cpus.update(range(first, last + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+@functools.lru_cache(maxsize=None)
+def performance_cores():
+    """
+    Return the performance cores of a hybrid CPU, or None
+
+    Uses /sys/devices/cpu_core/cpus (Intel hybrid) when present, otherwise the
+    cores whose maximum frequency is close to the highest one. Returns None
+    when the CPU isn't hybrid or affinity can't be set (only Linux supports it).
+    """
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+
+    allowed = os.sched_getaffinity(0)
+    try:
+        cores = parse_cpu_list(Path('/sys/devices/cpu_core/cpus').read_text())
+    except (OSError, ValueError):
+        max_freqs = {}
+        for cpu in allowed:
+            try:
+                freq_file = Path(f'/sys/devices/system/cpu/cpu{cpu}/cpufreq/cpuinfo_max_freq')
+                max_freqs[cpu] = int(freq_file.read_text())
+            except (OSError, ValueError):
+                return None
+        if not max_freqs:
+            return None
+        # Leave room for per-core boost differences on non-hybrid CPUs
+        threshold = max(max_freqs.values()) * P_CORE_FREQ_RATIO
+        cores = {cpu for cpu, freq in max_freqs.items() if freq >= threshold}
+
+    cores &= allowed
+    if not cores or cores == allowed:
+        return None
+    return frozenset(cores)
+
+
+def ffmpeg_command(stream):
+    """Compile an ffmpeg-python output stream to a command line reporting progress"""
+    stream = stream.global_args('-progress', 'pipe:2', '-nostats')
+    return stream.compile(overwrite_output=True)
+
+
+def run_ffmpeg(stream, duration=None, p_cores_only=False):
+    """
+    Run an ffmpeg command and display its progress
+
+    ffmpeg reports progress as key=value lines on stderr, read by a background
+    thread while it runs, so a full stderr pipe can never stall the encode and
+    stdout is left alone.
+
+    Args:
+        stream: ffmpeg-python output stream, or a command line from ffmpeg_command()
+        duration: Expected output duration in seconds, to show a percentage
+        p_cores_only: Restrict ffmpeg to the performance cores of a hybrid CPU
+
+    Raises:
+        ffmpeg.Error: If ffmpeg fails (stderr holds the end of its log)
+    """
+    cores = performance_cores() if p_cores_only else None
+    if cores:
+        print(f"Running on performance cores: {', '.join(map(str, sorted(cores)))}")
+    elif p_cores_only:
+        print("Warning: No separate performance cores found, using all cores", file=sys.stderr)
+
+    args = stream if isinstance(stream, list) else ffmpeg_command(stream)
+    process = subprocess.Popen(
+        args, stderr=subprocess.PIPE,
+        preexec_fn=(lambda: os.sched_setaffinity(0, cores)) if cores else None
+    )
+    log = deque(maxlen=PROGRESS_LOG_LINES)
+
+    def read_stderr():
+        for raw in process.stderr:
+            line = raw.decode(errors='replace').rstrip()
+            if not PROGRESS_LINE.match(line):
+                log.append(line)
+            elif line.startswith('out_time_us=') and duration:
+                out_time = line.partition('=')[2]
+                if out_time.isdigit():
+                    percent = min(int(out_time) / 1e6 / duration * 100, 100.0)
+                    print(f"\rProgress: {percent:.1f}%", end='', flush=True)
+
+    reader = threading.Thread(target=read_stderr, daemon=True)
+    reader.start()
+    process.wait()
+    reader.join()
+
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', None, '\n'.join(log).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def cpu_capabilities(encoder):
+    """
+    Return the CPU capabilities an encoder reports, e.g. "MMX2 SSE2Fast ... AVX2"
+
+    libx264/libx265 only log this line once the encoder is opened, so a
+    single tiny frame is encoded to a null output. Returns None if unknown.
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-f', 'lavfi', '-i', 'testsrc=size=64x64:rate=1',
+           '-frames:v', '1', '-c:v', encoder, '-f', 'null', '-']
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError:
+        return None
+
+    for line in result.stderr.splitlines():
+        if 'using cpu capabilities:' in line:
+            return line.split('using cpu capabilities:', 1)[1].strip()
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def hw_encoder_works(backend, encoder):
+    """
+    Check that a hardware encoder can actually open on this machine
+
+    Being compiled into ffmpeg says nothing about the GPU or driver being
+    present, so a single frame is encoded to a null output.
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-f', 'lavfi', '-i', 'testsrc=size=256x256:rate=1',
+           *HW_TEST_ARGS.get(backend, []), '-frames:v', '1', '-c:v', encoder, '-f', 'null', '-']
+    try:
+        return subprocess.run(cmd, capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def check_simd(encoder):
+    """Warn if an encoder was built without SIMD (assembly) optimizations"""
+    capabilities = cpu_capabilities(encoder)
+    if capabilities and capabilities.startswith('none'):
+        print(f"Warning: {encoder} was built without SIMD support and will encode "
+              f"several times slower. See the README for optimized FFmpeg builds.",
+              file=sys.stderr)
+
+
+@functools.lru_cache(maxsize=None)
+def has_avx512():
+    """Check whether the CPU supports AVX-512 (uses cpufeature if installed)"""
+    if cpufeature is not None:
+        return bool(cpufeature.CPUFeature.get('AVX512f'))
+
+    try:
+        with open('/proc/cpuinfo') as f:
+            return any(line.startswith('flags') and ' avx512f' in line for line in f)
+    except OSError:
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def cpu_microarch():
+    """
+    Return the CPU microarchitecture as a key of ASM_MASKS, or 'other'
+
+    Reads /proc/cpuinfo, which is instant; py-cpuinfo (which can take a
+    second or more) is only used where that file doesn't exist, if installed.
+    """
+    try:
+        fields = {}
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if not line.strip():
+                    break  # Only the first processor is needed
+                key, _, value = line.partition(':')
+                fields[key.strip()] = value.strip()
+        vendor = fields.get('vendor_id')
+        family = int(fields.get('cpu family', -1))
+        model = int(fields.get('model', 0))
+    except OSError:
+        try:
+            import cpuinfo
+        except ImportError:
+            return 'other'
+        info = cpuinfo.get_cpu_info()
+        vendor, family, model = info.get('vendor_id_raw'), info.get('family'), info.get('model', 0)
+    except ValueError:
+        return 'other'
+
+    if vendor != 'AuthenticAMD' or family != 0x17:
+        return 'other'
+
+    # Family 17h covers Zen/Zen+ (models below 30h) and Zen2 (30h and up)
+    return 'zen1' if model < 0x30 else 'zen2'
+
+
+def software_encoder_options(encoder):
+    """Return extra output options tuning libx264/libx265 for the current CPU"""
+    if encoder not in ('libx264', 'libx265'):
+        return {}
+
+    check_simd(encoder)
+
+    asm = ASM_MASKS.get(cpu_microarch())
+    # x265 leaves AVX-512 disabled unless explicitly asked for
+    if asm is None and encoder == 'libx265' and has_avx512():
+        asm = 'avx512'
+    if asm:
+        return {f'{encoder[3:]}-params': f'asm={asm}'}
+    return {}
+
+
+def can_stream_copy(input_file, output_format, video_codec, audio_codec):
+    """
+    Check whether the input can be remuxed into the output container as-is
+
+    Every stream must already be in a codec the container accepts, and the
+    video/audio streams must already use the requested codecs.
+    """
+    try:
+        streams = cached_probe(input_file)['streams']
+    except (ffmpeg.Error, OSError):
+        return False  # Unprobeable input or ffprobe missing, convert normally
+
+    compatible = COMPATIBLE_CODECS.get(output_format, set())
+    requested = {
+        'video': ENCODER_CODECS.get(video_codec, video_codec),
+        'audio': ENCODER_CODECS.get(audio_codec, audio_codec),
+    }
+
+    for s in streams:
+        codec_type = s.get('codec_type')
+        if codec_type not in ('video', 'audio', 'subtitle'):
+            continue
+        if s.get('codec_name') not in compatible:
+            return False
+        if codec_type in requested and s.get('codec_name') != requested[codec_type]:
+            return False
+
+    return True
+
+
+def select_hw_encoder(video_codec, hw="auto"):
+    """
+    Pick a hardware encoder matching a software video codec
+
+    Args:
+        video_codec: Requested software codec (libx264, libx265)
+        hw: Hardware backend (auto, nvenc, qsv, vt, vaapi, none)
+
+    Returns:
+        (backend, encoder) tuple, or (None, video_codec) if no hardware encoder is usable
+    """
+    if hw == "none":
+        return None, video_codec
+
+    backends = HW_ENCODERS if hw == "auto" else [hw]
+    encoders = available_encoders()
+    for backend in backends:
+        encoder = HW_ENCODERS[backend].get(video_codec)
+        if encoder in encoders and hw_encoder_works(backend, encoder):
+            return backend, encoder
+
+    return None, video_codec
+
+
+@functools.lru_cache(maxsize=None)
+def convert_command_template(stream_copy, backend, encoder, resolution, audio_codec,
+                             video_bitrate, audio_bitrate):
+    """
+    Build the ffmpeg command line for convert_video with placeholder paths
+
+    Conversions with the same options differ only in their paths, so the
+    ffmpeg-python graph is built and compiled once per option set.
+
+    Returns:
+        Tuple of arguments containing INPUT_PLACEHOLDER and OUTPUT_PLACEHOLDER
+    """
+    stream = ffmpeg.input(INPUT_PLACEHOLDER, **HW_INPUT_OPTIONS.get(backend, {}))
+
+    # Apply video filters if resolution is specified
+    if resolution:
+        width, height = map(int, resolution.split('x'))
+        if backend:
+            stream = ffmpeg.filter(stream, HW_SCALE_FILTERS[backend], width, height)
+        else:
+            stream = scale_filter(stream, width, height, encoder)
+
+    # Set output options
+    if stream_copy:
+        output_options = {'c': 'copy'}  # Copy codec without re-encoding
+    else:
+        output_options = {
+            'vcodec': encoder,
+            'acodec': audio_codec,
+            'audio_bitrate': audio_bitrate,
+        }
+        output_options.update(HW_ENCODER_OPTIONS.get(backend, {}))
+        output_options.update(software_encoder_options(encoder))
+
+        if video_bitrate:
+            output_options['video_bitrate'] = video_bitrate
+
+    stream = ffmpeg.output(stream, OUTPUT_PLACEHOLDER, **output_options)
+    return tuple(ffmpeg_command(stream))
+
 
 def convert_video(input_file, output_file=None, output_format="mp4",
                  resolution=None, video_codec="libx264", audio_codec="aac",
-                 video_bitrate=None, audio_bitrate="192k"):
+                 video_bitrate=None, audio_bitrate="192k", hw="auto", p_cores_only=False):
     """
     Convert a video file to different format/resolution
 
@@ -25,6 +541,8 @@ def convert_video(input_file, output_file=None, output_format="mp4",
         audio_codec: Audio codec (aac, mp3, opus)
         video_bitrate: Video bitrate (e.g., "2M", "5M")
         audio_bitrate: Audio bitrate (default: 192k)
+        hw: Hardware encoder backend (auto, nvenc, qsv, vt, vaapi, none)
+        p_cores_only: Run ffmpeg only on the performance cores of a hybrid CPU
     """
     input_path = Path(input_file)
 
@@ -37,34 +555,112 @@ def convert_video(input_file, output_file=None, output_format="mp4",
         output_file = input_path.stem + f"_converted.{output_format}"
 
     output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    ensure_dir(output_path.parent)
+
+    # Only the container changes, so the streams can be copied as-is
+    container = output_path.suffix.lstrip('.') or output_format
+    stream_copy = (not resolution and not video_bitrate
+                   and can_stream_copy(input_file, container, video_codec, audio_codec))
+
+    if stream_copy:
+        backend, encoder = None, 'copy'
+    else:
+        backend, encoder = select_hw_encoder(video_codec, hw)
 
     try:
         print(f"Converting: {input_file} -> {output_file}")
+        if stream_copy:
+            print("Input codecs already match the output container, remuxing without re-encoding")
+        elif backend:
+            print(f"Using hardware encoder: {encoder}")
 
-        # Build ffmpeg command
-        stream = ffmpeg.input(input_file)
+        # Build ffmpeg command, substituting the paths into the cached command line
+        template = convert_command_template(stream_copy, backend, encoder, resolution,
+                                            audio_codec, video_bitrate, audio_bitrate)
+        paths = {INPUT_PLACEHOLDER: str(input_file), OUTPUT_PLACEHOLDER: str(output_file)}
+        args = [paths.get(arg, arg) for arg in template]
+
+        # Run conversion
+        run_ffmpeg(args, probe_duration(input_file), p_cores_only)
+
+        print(f"\nSuccessfully converted to: {output_file}")
+        return True
+
+    except ffmpeg.Error as e:
+        if backend:
+            # The encoder may be compiled in without a usable device behind it
+            print(f"Hardware encoding with {encoder} failed, retrying in software", file=sys.stderr)
+            return convert_video(input_file, output_file, output_format, resolution,
+                                 video_codec, audio_codec, video_bitrate, audio_bitrate,
+                                 hw="none", p_cores_only=p_cores_only)
+        print(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}", file=sys.stderr)
+        return False
+    except Exception as e:
+        print(f"Error converting video: {e}", file=sys.stderr)
+        return False
+
+
+def convert_ladder(input_file, output_dir=None, rungs=("1080p", "720p", "480p", "360p"),
+                   output_format="mp4", video_codec="libx264", audio_codec="aac",
+                   audio_bitrate="192k", p_cores_only=False):
+    """
+    Convert a video to several resolutions in a single ffmpeg pass
+
+    The input is decoded once and split into one scaler/encoder per rung,
+    instead of decoding it again for every resolution.
+
+    Args:
+        input_file: Input video file path
+        output_dir: Directory for the outputs (default: next to the input)
+        rungs: Resolutions to produce (e.g., "1080p", "720p")
+        output_format: Output format (mp4, webm, mkv)
+        video_codec: Video codec (libx264, libx265, libvpx-vp9)
+        audio_codec: Audio codec (aac, mp3, opus)
+        audio_bitrate: Audio bitrate (default: 192k)
+        p_cores_only: Run ffmpeg only on the performance cores of a hybrid CPU
+    """
+    input_path = Path(input_file)
 
-        # Apply video filters if resolution is specified
-        if resolution:
-            width, height = map(int, resolution.split('x'))
-            stream = ffmpeg.filter(stream, 'scale', width, height)
+    if not input_path.exists():
+        print(f"Error: Input file '{input_file}' not found", file=sys.stderr)
+        return False
+
+    unknown = [rung for rung in rungs if rung not in LADDER_RUNGS]
+    if unknown:
+        print(f"Error: Unknown rungs: {', '.join(unknown)} "
+              f"(choose from {', '.join(LADDER_RUNGS)})", file=sys.stderr)
+        return False
+
+    output_dir = Path(output_dir) if output_dir else input_path.parent
+    ensure_dir(output_dir)
+
+    try:
+        print(f"Converting {input_file} to: {', '.join(rungs)}")
+
+        stream = ffmpeg.input(input_file)
+        split = stream.video.filter_multi_output('split', len(rungs))
+        # stream.audio maps 0:a, which fails on video-only inputs
+        has_audio = any(s.get('codec_type') == 'audio'
+                        for s in cached_probe(input_file)['streams'])
+        audio = [stream.audio] if has_audio else []
 
-        # Set output options
         output_options = {
             'vcodec': video_codec,
             'acodec': audio_codec,
             'audio_bitrate': audio_bitrate,
         }
+        output_options.update(software_encoder_options(video_codec))
 
-        if video_bitrate:
-            output_options['video_bitrate'] = video_bitrate
+        outputs = []
+        for i, rung in enumerate(rungs):
+            output_file = output_dir / f"{input_path.stem}_{rung}.{output_format}"
+            # Width -2 keeps the aspect ratio while staying divisible by 2
+            video = split[i].filter('scale', -2, LADDER_RUNGS[rung])
+            outputs.append(ffmpeg.output(video, *audio, str(output_file), **output_options))
 
-        # Run conversion
-        stream = ffmpeg.output(stream, str(output_file), **output_options)
-        ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+        run_ffmpeg(ffmpeg.merge_outputs(*outputs), probe_duration(input_file), p_cores_only)
 
-        print(f"\nSuccessfully converted to: {output_file}")
+        print(f"\nSuccessfully converted to {len(rungs)} resolutions in: {output_dir}")
         return True
 
     except ffmpeg.Error as e:
@@ -75,33 +671,106 @@ def convert_video(input_file, output_file=None, output_format="mp4",
         return False
 
 
+def parse_time(value):
+    """Convert a time ("HH:MM:SS", "MM:SS" or seconds) to seconds"""
+    seconds = 0.0
+    for part in str(value).split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def probe_keyframes(input_file, start, end):
+    """
+    Find the video keyframes of a clip
+
+    ffprobe seeks to the keyframe at or before start, so the first timestamp
+    is where a stream-copied clip would actually begin.
+
+    Returns:
+        (codec_name, keyframe_times) tuple for the first video stream
+    """
+    probe = cached_probe(input_file, select_streams='v:0', skip_frame='nokey',
+                         show_entries='frame=pts_time,best_effort_timestamp_time',
+                         read_intervals=f'{start}%{end}')
+
+    codec_name = probe['streams'][0]['codec_name'] if probe.get('streams') else None
+
+    keyframes = []
+    for frame in probe.get('frames', []):
+        t = frame.get('pts_time', frame.get('best_effort_timestamp_time'))
+        if t not in (None, 'N/A'):
+            keyframes.append(float(t))
+
+    return codec_name, sorted(keyframes)
+
+
 def extract_clip(input_file, output_file, start_time, duration=None, end_time=None):
     """
     Extract a clip from a video
 
+    Stream copy can only start at a keyframe. When start_time falls between
+    keyframes, only the frames up to the next keyframe are re-encoded; the
+    rest is stream-copied and the two parts are joined.
+
     Args:
         input_file: Input video file path
         output_file: Output file path
         start_time: Start time (format: "HH:MM:SS" or seconds)
         duration: Duration in seconds (optional)
         end_time: End time (format: "HH:MM:SS" or seconds) (optional)
+
+    Without duration or end_time, the clip runs to the end of the input.
     """
+    if Path(input_file).suffix.lower() in ANNEXB_EXTENSIONS:
+        print(f"Error: '{input_file}' is a raw video stream without timestamps, "
+              f"run the convert command on it before clipping", file=sys.stderr)
+        return False
+
     try:
         print(f"Extracting clip from: {input_file}")
 
-        stream = ffmpeg.input(input_file, ss=start_time)
-
-        output_options = {'c': 'copy'}  # Copy codec without re-encoding
-
+        start = parse_time(start_time)
         if duration:
-            output_options['t'] = duration
+            length = parse_time(duration)
         elif end_time:
-            output_options['to'] = end_time
-
-        stream = ffmpeg.output(stream, output_file, **output_options)
-        ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
-
-        print(f"Successfully extracted clip to: {output_file}")
+            length = parse_time(end_time) - start
+        else:
+            length = None  # Until the end of the input
+
+        end = start + length if length is not None else probe_duration(input_file)
+        if end is not None:
+            codec_name, keyframes = probe_keyframes(input_file, start, end)
+        else:
+            codec_name, keyframes = None, []
+        before = [k for k in keyframes if k <= start + KEYFRAME_TOLERANCE]
+        after = [k for k in keyframes if start + KEYFRAME_TOLERANCE < k < end]
+        encoder = SMART_CUT_ENCODERS.get(codec_name)
+        mid_gop = bool(before) and encoder is not None and start - before[-1] > KEYFRAME_TOLERANCE
+
+        clip_options = {'t': length} if length is not None else {}
+
+        if mid_gop and after:
+            print(f"Re-encoding {after[0] - start:.2f}s up to the next keyframe")
+            smart_cut(input_file, output_file, start, end - start, after[0],
+                      after[1] if len(after) > 1 else end, encoder)
+        elif mid_gop:
+            # No keyframe inside the clip, so all of it has to be re-encoded
+            print("Re-encoding the clip, it contains no keyframe")
+            stream = ffmpeg.input(input_file, ss=start)
+            stream = ffmpeg.output(stream, output_file, vcodec=encoder, acodec='copy', **clip_options)
+            run_ffmpeg(stream, end - start)
+        elif before:
+            # Copy codec without re-encoding, from the keyframe the clip starts at
+            copy_from_keyframe(input_file, output_file, before[-1],
+                               after[0] if after else end,
+                               start + length if length is not None else None)
+        else:
+            stream = ffmpeg.input(input_file, ss=start)
+            # Copy codec without re-encoding
+            stream = ffmpeg.output(stream, output_file, c='copy', **clip_options)
+            run_ffmpeg(stream, end - start if end is not None else None)
+
+        print(f"\nSuccessfully extracted clip to: {output_file}")
         return True
 
     except ffmpeg.Error as e:
@@ -112,6 +781,56 @@ def extract_clip(input_file, output_file, start_time, duration=None, end_time=No
         return False
 
 
+def copy_from_keyframe(input_file, output_file, keyframe, limit, end=None):
+    """
+    Stream-copy a video from a keyframe up to end (or the end of the input)
+
+    Input -ss can't be used here: for streams with B-frames ffmpeg seeks
+    3/23 s before the requested time, so the copy starts a whole GOP early.
+    The concat demuxer's inpoint seeks without that margin, and packets from
+    the keyframe on are still copied. MP4 indexes a keyframe a frame or two
+    after its pts, so the inpoint sits halfway to limit, the next keyframe.
+    """
+    source = os.path.abspath(input_file).replace("'", "'\\''")
+    lines = [f"file '{source}'", f"inpoint {(keyframe + limit) / 2}"]
+    if end is not None:
+        lines.append(f"outpoint {end}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        listing = Path(tmp) / "source.txt"
+        listing.write_text('\n'.join(lines) + '\n')
+        stream = ffmpeg.input(str(listing), f='concat', safe=0)
+        stream = ffmpeg.output(stream, output_file, c='copy')
+        run_ffmpeg(stream, end - keyframe if end is not None else None)
+
+
+def smart_cut(input_file, output_file, start, length, keyframe, limit, encoder):
+    """
+    Cut a clip that starts between keyframes
+
+    [start, keyframe) is re-encoded, [keyframe, start + length) is stream-copied,
+    and the concat demuxer joins both. The parts are MPEG-TS so each carries its
+    own parameter sets. limit is the keyframe after keyframe, or the clip end.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        lead_in = Path(tmp) / "lead_in.ts"
+        remainder = Path(tmp) / "remainder.ts"
+        segments = Path(tmp) / "segments.txt"
+
+        # The margin keeps the last frame, whose end lands on the keyframe give or
+        # take the millisecond rounding of container timestamps
+        stream = ffmpeg.input(input_file, ss=start)
+        stream = ffmpeg.output(stream, str(lead_in), vcodec=encoder, acodec='copy',
+                               t=keyframe - start + 0.001)
+        run_ffmpeg(stream)
+
+        copy_from_keyframe(input_file, str(remainder), keyframe, limit, start + length)
+
+        segments.write_text(f"file '{lead_in}'\nfile '{remainder}'\n")
+        stream = ffmpeg.input(str(segments), f='concat', safe=0)
+        stream = ffmpeg.output(stream, output_file, c='copy')
+        run_ffmpeg(stream, length)
+
 def main():
     parser = argparse.ArgumentParser(description="Convert videos using FFmpeg")
     subparsers = parser.add_subparsers(dest='command', help='Commands')
@@ -132,6 +851,29 @@ def main():
     convert_parser.add_argument("--vbitrate", help="Video bitrate (e.g., 2M)")
     convert_parser.add_argument("--abitrate", default="192k",
                                help="Audio bitrate (default: 192k)")
+    convert_parser.add_argument("--hw", default="auto",
+                               choices=["auto", "nvenc", "qsv", "vt", "vaapi", "none"],
+                               help="Hardware encoder backend (default: auto)")
+    convert_parser.add_argument("--p-cores-only", action="store_true",
+                               help="Run ffmpeg only on performance cores of hybrid CPUs (Linux)")
+
+    # Ladder command
+    ladder_parser = subparsers.add_parser('ladder', help='Convert video to several resolutions at once')
+    ladder_parser.add_argument("input", help="Input video file")
+    ladder_parser.add_argument("-o", "--output", help="Output directory (default: next to input)")
+    ladder_parser.add_argument("--rungs", default="1080p,720p,480p,360p",
+                              help="Comma-separated resolutions (default: 1080p,720p,480p,360p)")
+    ladder_parser.add_argument("-f", "--format", default="mp4",
+                              choices=["mp4", "webm", "mkv"],
+                              help="Output format (default: mp4)")
+    ladder_parser.add_argument("--vcodec", default="libx264",
+                              help="Video codec (default: libx264)")
+    ladder_parser.add_argument("--acodec", default="aac",
+                              help="Audio codec (default: aac)")
+    ladder_parser.add_argument("--abitrate", default="192k",
+                              help="Audio bitrate (default: 192k)")
+    ladder_parser.add_argument("--p-cores-only", action="store_true",
+                              help="Run ffmpeg only on performance cores of hybrid CPUs (Linux)")
 
     # Clip command
     clip_parser = subparsers.add_parser('clip', help='Extract a clip from video')
@@ -150,7 +892,13 @@ def main():
     if args.command == 'convert':
         success = convert_video(
             args.input, args.output, args.format, args.resolution,
-            args.vcodec, args.acodec, args.vbitrate, args.abitrate
+            args.vcodec, args.acodec, args.vbitrate, args.abitrate, args.hw,
+            args.p_cores_only
+        )
+    elif args.command == 'ladder':
+        success = convert_ladder(
+            args.input, args.output, args.rungs.split(','), args.format,
+            args.vcodec, args.acodec, args.abitrate, args.p_cores_only
         )
     elif args.command == 'clip':
         if args.duration is None and args.end is None:
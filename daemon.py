@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+YouTube Download Daemon
+Keeps yt-dlp loaded and runs downloads sent over a Unix socket
+"""
+
+import yt_dlp
+import argparse
+import contextlib
+import json
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from download_audio import download_audio
+from download_playlist import download_playlist
+from download_video import download_video
+from utils import DAEMON_SOCKET
+
+
+DOWNLOADERS = {
+    'video': download_video,
+    'audio': download_audio,
+    'playlist': download_playlist,
+}
+
+# Idle YoutubeDL instances, keyed by their options
+_idle = {}
+_idle_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def pooled_youtubedl(ydl_opts):
+    """
+    Borrow an idle YoutubeDL created with the same options, or create one
+
+    Reusing instances keeps their extractors and player caches warm. An
+    instance is only used by one download at a time.
+    """
+    key = json.dumps({k: v for k, v in ydl_opts.items() if k != 'progress_hooks'},
+                     sort_keys=True, default=str)
+
+    with _idle_lock:
+        idle = _idle.setdefault(key, [])
+        ydl = idle.pop() if idle else None
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(ydl_opts)
+
+    try:
+        yield ydl
+    except BaseException:
+        ydl.close()
+        raise
+
+    with _idle_lock:
+        _idle[key].append(ydl)
+
+
+def handle_client(conn):
+    """Run the download request sent on a connection and reply with the result"""
+    with conn:
+        try:
+            request = json.loads(conn.makefile('r').readline())
+            downloader = DOWNLOADERS[request['mode']]
+            opts = dict(request.get('opts', {}))
+            if downloader is not download_playlist:
+                opts['ydl_factory'] = pooled_youtubedl
+            success = downloader(request['url'], **opts)
+        except Exception as e:
+            print(f"Error handling request: {e}", file=sys.stderr)
+            success = False
+
+        try:
+            conn.sendall(json.dumps({'ok': bool(success)}).encode() + b"\n")
+        except OSError:
+            pass  # Client went away
+
+
+def serve(socket_path=DAEMON_SOCKET, workers=4):
+    """
+    Serve download requests until interrupted
+
+    Args:
+        socket_path: Unix socket to listen on
+        workers: Number of downloads to run in parallel
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        print("Error: Unix sockets are not supported on this platform", file=sys.stderr)
+        return False
+
+    if os.path.exists(socket_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)  # Left behind by a daemon that died
+            else:
+                print(f"Error: A daemon is already listening on {socket_path}", file=sys.stderr)
+                return False
+
+    # Clients choose where downloads are written, so only our own user may connect
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen()
+    print(f"Listening on: {socket_path}")
+
+    try:
+        with server, ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                conn, _ = server.accept()
+                executor.submit(handle_client, conn)
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run downloads in a long-lived yt-dlp process")
+    parser.add_argument("--socket", default=DAEMON_SOCKET,
+                       help=f"Unix socket to listen on (default: {DAEMON_SOCKET})")
+    parser.add_argument("-j", "--workers", type=int, default=4,
+                       help="Number of downloads to run in parallel (default: 4)")
+
+    args = parser.parse_args()
+
+    success = serve(args.socket, args.workers)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
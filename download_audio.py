@@ -4,14 +4,23 @@ YouTube Audio Downloader
 Downloads audio from YouTube videos in various formats
 """
 
-import yt_dlp
 import argparse
+import os
 import sys
-from pathlib import Path
+
+from utils import (CACHE_DIR, downloader_options, ensure_dir, extract_info_cached,
+                   make_progress_hook, send_to_daemon)
+
+
+# Prefer sources already holding the output codec, so extracting is a stream copy
+FORMAT_SORT = {
+    'm4a': ['acodec:aac', 'abr'],
+    'opus': ['acodec:opus', 'abr', 'asr'],
+}
 
 
 def download_audio(url, output_path="downloads/audio", audio_format="mp3", quality="192",
-                   no_check_certificate=False):
+                   no_check_certificate=False, max_abr=None, ydl_factory=None):
     """
     Download audio from a YouTube video
 
@@ -21,26 +30,46 @@ def download_audio(url, output_path="downloads/audio", audio_format="mp3", quali
         audio_format: Output format (mp3, m4a, wav, flac, opus)
         quality: Audio quality in kbps (320, 256, 192, 128, 96)
         no_check_certificate: Skip SSL certificate verification (use for SSL errors)
+        max_abr: Highest source audio bitrate to download in kbps (optional)
+        ydl_factory: Callable returning a YoutubeDL context manager (default: yt_dlp.YoutubeDL)
     """
+    # Imported on first use so --daemon clients don't load yt-dlp
+    import yt_dlp
+
     # Create output directory if it doesn't exist
-    Path(output_path).mkdir(parents=True, exist_ok=True)
+    ensure_dir(output_path)
+
+    # Audio-only formats, so no video is downloaded just to be thrown away
+    audio_only = 'bestaudio[acodec!=none]'
+    if max_abr:
+        audio_only = f'bestaudio[acodec!=none][abr<={max_abr}]/worstaudio[acodec!=none]'
 
     ydl_opts = {
-        'format': 'bestaudio/best',
+        'format': audio_only,
+        'keepvideo': False,
         'outtmpl': f'{output_path}/%(title)s.%(ext)s',
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
             'preferredcodec': audio_format,
             'preferredquality': quality,
         }],
-        'progress_hooks': [progress_hook],
+        'cachedir': str(CACHE_DIR / 'yt-dlp'),  # Share signature cache between runs
+        **downloader_options(),
+        'progress_hooks': [make_progress_hook("Download complete, extracting audio...")],
         'nocheckcertificate': True,  # Skip SSL certificate verification
     }
 
+    if audio_format in FORMAT_SORT:
+        ydl_opts['format_sort'] = FORMAT_SORT[audio_format]
+
+    # libmp3lame encodes from 16-bit samples faster than from float
+    if audio_format == 'mp3':
+        ydl_opts['postprocessor_args'] = {'extractaudio': ['-sample_fmt', 's16p']}
+
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with (ydl_factory or yt_dlp.YoutubeDL)(ydl_opts) as ydl:
             print(f"Downloading audio from: {url}")
-            info = ydl.extract_info(url, download=True)
+            info = extract_info_cached(ydl, url)
             print(f"\nSuccessfully extracted audio: {info.get('title', 'audio')}")
             return True
     except Exception as e:
@@ -48,18 +77,6 @@ def download_audio(url, output_path="downloads/audio", audio_format="mp3", quali
         return False
 
 
-def progress_hook(d):
-    """Progress hook to display download progress"""
-    if d['status'] == 'downloading':
-        total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-        downloaded = d.get('downloaded_bytes', 0)
-        if total > 0:
-            percent = (downloaded / total) * 100
-            print(f"\rProgress: {percent:.1f}% ({downloaded}/{total} bytes)", end='')
-    elif d['status'] == 'finished':
-        print("\nDownload complete, extracting audio...")
-
-
 def main():
     parser = argparse.ArgumentParser(description="Download audio from YouTube videos")
     parser.add_argument("url", help="YouTube video URL")
@@ -73,11 +90,24 @@ def main():
                        help="Audio quality in kbps (default: 192)")
     parser.add_argument("--no-check-certificate", action="store_true",
                        help="Skip SSL certificate verification (use if you get SSL errors)")
+    parser.add_argument("--max-abr", type=int,
+                       help="Highest source audio bitrate to download in kbps (e.g., 128)")
+    parser.add_argument("--daemon", action="store_true",
+                       help="Run the download in a running daemon.py instead")
 
     args = parser.parse_args()
 
-    success = download_audio(args.url, args.output, args.format, args.quality,
-                            args.no_check_certificate)
+    if args.daemon:
+        success = send_to_daemon('audio', args.url, {
+            'output_path': os.path.abspath(args.output),
+            'audio_format': args.format,
+            'quality': args.quality,
+            'no_check_certificate': args.no_check_certificate,
+            'max_abr': args.max_abr,
+        })
+    else:
+        success = download_audio(args.url, args.output, args.format, args.quality,
+                                args.no_check_certificate, args.max_abr)
     sys.exit(0 if success else 1)
 
 
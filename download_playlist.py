@@ -4,18 +4,90 @@ YouTube Playlist Downloader
 Downloads entire YouTube playlists or channels
 """
 
-import yt_dlp
 import argparse
+import multiprocessing
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+from utils import downloader_options, ensure_dir, make_progress_hook, send_to_daemon
+
+
+# Video and audio codecs used when a download has to be converted into a container
+CONTAINER_CODECS = {
+    'mp4': ('libx264', 'aac'),
+    'mkv': ('libx264', 'aac'),
+    'webm': ('libvpx-vp9', 'libopus'),
+}
+
+
+def convert_download(filepath, format_type):
+    """
+    Convert a downloaded video into the format_type container, replacing it
+
+    Streams the container can already hold are remuxed as they are, like
+    container_postprocessor does; only the others are re-encoded. Runs in a
+    worker process, off the download threads.
+    """
+    import ffmpeg
+    from convert_video import COMPATIBLE_CODECS, cached_probe, convert_video
+
+    video_codec, audio_codec = CONTAINER_CODECS[format_type]
+    try:
+        streams = [s for s in cached_probe(filepath)['streams']
+                   if s.get('codec_type') in ('video', 'audio', 'subtitle')]
+    except (ffmpeg.Error, OSError):
+        streams = []
+    if streams and all(s.get('codec_name') in COMPATIBLE_CODECS[format_type] for s in streams):
+        # Requesting the input's own codecs makes convert_video remux without re-encoding
+        codecs = {s['codec_type']: s['codec_name'] for s in streams}
+        video_codec = codecs.get('video', video_codec)
+        audio_codec = codecs.get('audio', audio_codec)
+
+    output_file = str(Path(filepath).with_suffix(f'.{format_type}'))
+    if convert_video(filepath, output_file, format_type,
+                     video_codec=video_codec, audio_codec=audio_codec):
+        os.remove(filepath)
+        return True
+    return False
+
+
+def flat_entries(ydl, info):
+    """
+    Yield the video entries of a flat listing
+
+    Follows url results (e.g. a channel URL pointing at its videos tab) and
+    expands nested playlists such as channel tabs, so only videos are yielded.
+    """
+    resolved = info
+    while resolved.get('_type') in ('url', 'url_transparent'):
+        resolved = ydl.extract_info(resolved['url'], ie_key=resolved.get('ie_key'),
+                                    download=False, process=False)
+    if 'entries' not in resolved:
+        # A single video, keep the url result so it can be downloaded as usual
+        yield info
+        return
+    for entry in resolved['entries']:
+        if not entry:
+            continue
+        if entry.get('_type') == 'playlist' or entry.get('ie_key') == 'YoutubeTab':
+            yield from flat_entries(ydl, entry)
+        else:
+            yield entry
+
 
 def download_playlist(url, output_path="downloads/playlists", quality="best",
                      format_type="mp4", audio_only=False, start=1, end=None,
-                     no_check_certificate=False):
+                     no_check_certificate=False, workers=4, fragments=8):
     """
     Download a YouTube playlist
 
+    Entries are listed first without downloading, then fetched concurrently
+    by a pool of workers, each running its own YoutubeDL instance. Videos that
+    need converting into format_type are handed to a separate process pool,
+    so downloads carry on while ffmpeg runs.
+
     Args:
         url: YouTube playlist URL
         output_path: Directory to save videos
@@ -25,9 +97,14 @@ def download_playlist(url, output_path="downloads/playlists", quality="best",
         start: Start downloading from this video number
         end: Stop downloading at this video number
         no_check_certificate: Skip SSL certificate verification (use for SSL errors)
+        workers: Number of videos to download in parallel
+        fragments: Number of fragments to download in parallel per video (without aria2c)
     """
+    # Imported on first use so --daemon clients don't load yt-dlp
+    import yt_dlp
+
     # Create output directory if it doesn't exist
-    Path(output_path).mkdir(parents=True, exist_ok=True)
+    ensure_dir(output_path)
 
     # Define quality settings
     quality_map = {
@@ -39,18 +116,17 @@ def download_playlist(url, output_path="downloads/playlists", quality="best",
     }
 
     ydl_opts = {
-        'outtmpl': f'{output_path}/%(playlist_index)s - %(title)s.%(ext)s',
-        'progress_hooks': [progress_hook],
+        'progress_hooks': [make_progress_hook()],
         'ignoreerrors': True,  # Continue on download errors
-        'playlist_start': start,
+        **downloader_options(fragments),
     }
 
-    if end:
-        ydl_opts['playlist_end'] = end
-
     if no_check_certificate:
         ydl_opts['nocheckcertificate'] = True
 
+    conversions = []
+    convert_pool = None
+
     if audio_only:
         ydl_opts['format'] = 'bestaudio/best'
         ydl_opts['postprocessors'] = [{
@@ -61,38 +137,71 @@ def download_playlist(url, output_path="downloads/playlists", quality="best",
     else:
         ydl_opts['format'] = quality_map.get(quality, quality_map["best"])
         ydl_opts['merge_output_format'] = format_type
-        ydl_opts['postprocessors'] = [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': format_type,
-        }]
+
+        # Workers start while download threads hold locks, so forking could deadlock them
+        convert_pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2),
+                                           mp_context=multiprocessing.get_context('spawn'))
+
+        def queue_conversion(filepath):
+            # Merged downloads already use format_type; only other containers need converting
+            if Path(filepath).suffix.lstrip('.') != format_type:
+                conversions.append(convert_pool.submit(convert_download, filepath, format_type))
+
+        ydl_opts['post_hooks'] = [queue_conversion]
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            print(f"Downloading playlist from: {url}")
-            info = ydl.extract_info(url, download=True)
+        print(f"Downloading playlist from: {url}")
 
-            if 'entries' in info:
-                print(f"\nSuccessfully downloaded playlist: {info.get('title', 'Unknown')}")
-                print(f"Total videos downloaded: {len([e for e in info['entries'] if e])}")
+        # List the playlist entries without resolving or downloading them
+        list_opts = {
+            'extract_flat': 'in_playlist',
+            'quiet': True,
+            'nocheckcertificate': no_check_certificate,
+        }
+        with yt_dlp.YoutubeDL(list_opts) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            if info.get('_type') in ('url', 'url_transparent', 'playlist'):
+                entries = list(flat_entries(ydl, info))
             else:
-                print("\nDownload completed")
+                entries = None
 
-            return True
+        if entries is None:
+            # Not a listing, let yt-dlp resolve it but keep the requested range
+            opts = dict(ydl_opts, outtmpl=f'{output_path}/%(title)s.%(ext)s',
+                        playliststart=start, playlistend=end)
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                ydl.download([url])
+            print("\nDownload completed")
+        else:
+            selected = list(enumerate(entries, 1))[start - 1:end]
+            width = len(str(len(entries)))
+
+            def download_entry(index, entry):
+                opts = dict(ydl_opts)
+                opts['outtmpl'] = f'{output_path}/{index:0{width}d} - %(title)s.%(ext)s'
+                entry_url = entry.get('url') or entry.get('webpage_url')
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    return ydl.download([entry_url]) == 0
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(lambda item: download_entry(*item), selected))
+
+            print(f"\nSuccessfully downloaded playlist: {info.get('title', 'Unknown')}")
+            print(f"Total videos downloaded: {sum(results)}")
+
+        if conversions:
+            print(f"Waiting for {len(conversions)} conversions to finish...")
+            failed = len(conversions) - sum(future.result() for future in conversions)
+            if failed:
+                print(f"Failed to convert {failed} videos", file=sys.stderr)
+
+        return True
     except Exception as e:
         print(f"Error downloading playlist: {e}", file=sys.stderr)
         return False
-
-
-def progress_hook(d):
-    """Progress hook to display download progress"""
-    if d['status'] == 'downloading':
-        total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-        downloaded = d.get('downloaded_bytes', 0)
-        if total > 0:
-            percent = (downloaded / total) * 100
-            print(f"\rProgress: {percent:.1f}% ({downloaded}/{total} bytes)", end='')
-    elif d['status'] == 'finished':
-        print("\nDownload complete, processing...")
+    finally:
+        if convert_pool:
+            convert_pool.shutdown()
 
 
 def main():
@@ -112,15 +221,35 @@ def main():
                        help="Start downloading from this video number (default: 1)")
     parser.add_argument("-e", "--end", type=int,
                        help="Stop downloading at this video number")
+    parser.add_argument("-j", "--workers", type=int, default=4,
+                       help="Number of videos to download in parallel (default: 4)")
+    parser.add_argument("--fragments", type=int, default=8,
+                       help="Number of fragments to download in parallel per video without aria2c (default: 8)")
     parser.add_argument("--no-check-certificate", action="store_true",
                        help="Skip SSL certificate verification (use if you get SSL errors)")
+    parser.add_argument("--daemon", action="store_true",
+                       help="Run the download in a running daemon.py instead")
 
     args = parser.parse_args()
 
-    success = download_playlist(
-        args.url, args.output, args.quality, args.format,
-        args.audio_only, args.start, args.end, args.no_check_certificate
-    )
+    if args.daemon:
+        success = send_to_daemon('playlist', args.url, {
+            'output_path': os.path.abspath(args.output),
+            'quality': args.quality,
+            'format_type': args.format,
+            'audio_only': args.audio_only,
+            'start': args.start,
+            'end': args.end,
+            'no_check_certificate': args.no_check_certificate,
+            'workers': args.workers,
+            'fragments': args.fragments,
+        })
+    else:
+        success = download_playlist(
+            args.url, args.output, args.quality, args.format,
+            args.audio_only, args.start, args.end, args.no_check_certificate,
+            args.workers, args.fragments
+        )
     sys.exit(0 if success else 1)
 
 
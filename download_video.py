@@ -4,14 +4,16 @@ YouTube Video Downloader
 Downloads YouTube videos in various quality options
 """
 
-import yt_dlp
 import argparse
+import os
 import sys
-from pathlib import Path
+
+from utils import (CACHE_DIR, container_postprocessor, downloader_options, ensure_dir,
+                   extract_info_cached, make_progress_hook, send_to_daemon)
 
 
 def download_video(url, output_path="downloads", quality="best", format_type="mp4",
-                   no_check_certificate=False):
+                   no_check_certificate=False, ydl_factory=None):
     """
     Download a YouTube video
 
@@ -21,9 +23,13 @@ def download_video(url, output_path="downloads", quality="best", format_type="mp
         quality: Video quality (best, 1080p, 720p, 480p, 360p)
         format_type: Output format (mp4, webm, mkv)
         no_check_certificate: Skip SSL certificate verification (use for SSL errors)
+        ydl_factory: Callable returning a YoutubeDL context manager (default: yt_dlp.YoutubeDL)
     """
+    # Imported on first use so --daemon clients don't load yt-dlp
+    import yt_dlp
+
     # Create output directory if it doesn't exist
-    Path(output_path).mkdir(parents=True, exist_ok=True)
+    ensure_dir(output_path)
 
     # Define quality settings
     quality_map = {
@@ -38,20 +44,19 @@ def download_video(url, output_path="downloads", quality="best", format_type="mp
         'format': quality_map.get(quality, quality_map["best"]),
         'outtmpl': f'{output_path}/%(title)s.%(ext)s',
         'merge_output_format': format_type,
-        'postprocessors': [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': format_type,
-        }],
-        'progress_hooks': [progress_hook],
+        'postprocessors': [container_postprocessor(format_type)],
+        'cachedir': str(CACHE_DIR / 'yt-dlp'),  # Share signature cache between runs
+        **downloader_options(),
+        'progress_hooks': [make_progress_hook()],
     }
 
     if no_check_certificate:
         ydl_opts['nocheckcertificate'] = True
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with (ydl_factory or yt_dlp.YoutubeDL)(ydl_opts) as ydl:
             print(f"Downloading video from: {url}")
-            info = ydl.extract_info(url, download=True)
+            info = extract_info_cached(ydl, url)
             print(f"\nSuccessfully downloaded: {info.get('title', 'video')}")
             return True
     except Exception as e:
@@ -59,18 +64,6 @@ def download_video(url, output_path="downloads", quality="best", format_type="mp
         return False
 
 
-def progress_hook(d):
-    """Progress hook to display download progress"""
-    if d['status'] == 'downloading':
-        total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-        downloaded = d.get('downloaded_bytes', 0)
-        if total > 0:
-            percent = (downloaded / total) * 100
-            print(f"\rProgress: {percent:.1f}% ({downloaded}/{total} bytes)", end='')
-    elif d['status'] == 'finished':
-        print("\nDownload complete, processing...")
-
-
 def main():
     parser = argparse.ArgumentParser(description="Download YouTube videos")
     parser.add_argument("url", help="YouTube video URL")
@@ -84,11 +77,21 @@ def main():
                        help="Output format (default: mp4)")
     parser.add_argument("--no-check-certificate", action="store_true",
                        help="Skip SSL certificate verification (use if you get SSL errors)")
+    parser.add_argument("--daemon", action="store_true",
+                       help="Run the download in a running daemon.py instead")
 
     args = parser.parse_args()
 
-    success = download_video(args.url, args.output, args.quality, args.format,
-                            args.no_check_certificate)
+    if args.daemon:
+        success = send_to_daemon('video', args.url, {
+            'output_path': os.path.abspath(args.output),
+            'quality': args.quality,
+            'format_type': args.format,
+            'no_check_certificate': args.no_check_certificate,
+        })
+    else:
+        success = download_video(args.url, args.output, args.quality, args.format,
+                                args.no_check_certificate)
     sys.exit(0 if success else 1)
 
 
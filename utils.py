@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the YouTube downloader scripts
+"""
+
+import json
+import shutil
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+
+CACHE_DIR = Path.home() / ".cache" / "youtube-download"
+
+# Cached stream URLs expire after about 6 hours, so stay well below that
+INFO_CACHE_TTL = 4 * 3600
+
+# Unix socket the download daemon listens on
+DAEMON_SOCKET = "/tmp/ytdl.sock"
+
+# Containers that can hold the downloaded streams without re-encoding
+REMUX_FORMATS = ('mp4', 'mkv')
+
+# Minimum seconds between two progress updates (~10 Hz)
+PROGRESS_INTERVAL = 0.1
+
+# Serializes progress output from concurrent download workers
+_print_lock = threading.Lock()
+
+# Directories already created by this process
+_created_dirs = set()
+_created_dirs_lock = threading.Lock()
+
+
+def ensure_dir(path):
+    """
+    Create a directory (and its parents) if it doesn't exist
+
+    Each directory is created at most once per process, so concurrent
+    downloads into the same directory don't repeat the filesystem calls.
+    """
+    path = str(path)
+    if path in _created_dirs:
+        return
+
+    with _created_dirs_lock:
+        if path not in _created_dirs:
+            Path(path).mkdir(parents=True, exist_ok=True)
+            _created_dirs.add(path)
+
+
+def make_progress_hook(finished_message="Download complete, processing..."):
+    """
+    Create a yt-dlp progress hook that displays download progress
+
+    yt-dlp calls the hook for every received chunk or fragment, so updates
+    are throttled and written straight to the stdout byte buffer.
+
+    Args:
+        finished_message: Message printed when a download finishes
+    """
+    last_ts = [0.0]
+
+    def progress_hook(d):
+        """Progress hook to display download progress"""
+        if d['status'] == 'downloading':
+            now = time.monotonic()
+            if now - last_ts[0] < PROGRESS_INTERVAL:
+                return
+
+            total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
+            downloaded = d.get('downloaded_bytes', 0)
+            if total > 0:
+                last_ts[0] = now
+                line = "\rProgress: %.1f%% (%d/%d bytes)" % (downloaded * 100 / total, downloaded, total)
+                with _print_lock:
+                    sys.stdout.flush()  # Keep ordering with pending print() output
+                    sys.stdout.buffer.write(line.encode())
+                    sys.stdout.buffer.flush()
+        elif d['status'] == 'finished':
+            with _print_lock:
+                print(f"\n{finished_message}")
+
+    return progress_hook
+
+
+def downloader_options(fragments=8):
+    """
+    Return yt-dlp options for downloading over parallel connections
+
+    Uses aria2c with 16 connections per file when it is installed, otherwise
+    yt-dlp's built-in downloader fetching HLS/DASH fragments concurrently.
+
+    Args:
+        fragments: Number of fragments to download in parallel (built-in downloader)
+    """
+    if shutil.which('aria2c'):
+        return {
+            'external_downloader': {'default': 'aria2c', 'm3u8': 'aria2c', 'dash': 'aria2c'},
+            'external_downloader_args': {
+                'aria2c': ['-x', '16', '-s', '16', '-k', '1M',
+                           '--file-allocation=none', '--summary-interval=0'],
+            },
+        }
+    return {
+        'concurrent_fragment_downloads': fragments,
+        'http_chunk_size': 10 * 1024 * 1024,
+    }
+
+
+def container_postprocessor(format_type):
+    """
+    Return the yt-dlp postprocessor that moves a download into a container
+
+    Remuxing only rewrites the container. The streams are re-encoded only
+    when the container cannot hold them (webm needs VP9/Opus).
+
+    Args:
+        format_type: Output format (mp4, webm, mkv)
+    """
+    if format_type in REMUX_FORMATS:
+        return {
+            'key': 'FFmpegVideoRemuxer',
+            'preferedformat': format_type,
+        }
+    return {
+        'key': 'FFmpegVideoConvertor',
+        'preferedformat': format_type,
+        'when': 'post_process',
+    }
+
+
+def video_id(url):
+    """Return the YouTube video id of a URL, or None if it has none"""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+
+    if host.endswith("youtu.be"):
+        return parsed.path.strip("/") or None
+    if host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        if "v" in parse_qs(parsed.query):
+            return parse_qs(parsed.query)["v"][0]
+        parts = parsed.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            return parts[1]
+    return None
+
+
+def extract_info_cached(ydl, url):
+    """
+    Download a video, reusing metadata extracted by a previous run
+
+    Extraction (player download, signature decoding) is the slow part of a
+    small download, so the info dict is cached per video id on disk.
+
+    Args:
+        ydl: YoutubeDL instance to download with
+        url: YouTube video URL
+
+    Returns:
+        The info dict of the downloaded video
+    """
+    import yt_dlp
+
+    vid = video_id(url)
+    # watch?v=X&list=Y downloads the playlist, which a cache keyed by X can't replay
+    if "list" in parse_qs(urlparse(url).query):
+        vid = None
+    cache_file = CACHE_DIR / "info" / f"{vid}.json" if vid else None
+
+    if cache_file and cache_file.exists() and time.time() - cache_file.stat().st_mtime < INFO_CACHE_TTL:
+        try:
+            cached = json.loads(cache_file.read_text())
+            return ydl.process_ie_result(cached, download=True)
+        except (OSError, ValueError, yt_dlp.utils.YoutubeDLError):
+            pass  # Stale or corrupt cache entry, extract again
+
+    info = ydl.extract_info(url, download=True)
+
+    # Playlist results lose their entries when sanitized
+    if cache_file and info.get('_type', 'video') == 'video':
+        try:
+            ensure_dir(cache_file.parent)
+            cache_file.write_text(json.dumps(ydl.sanitize_info(info, remove_private_keys=True)))
+        except OSError:
+            pass
+
+    return info
+
+
+def send_to_daemon(mode, url, opts, socket_path=DAEMON_SOCKET):
+    """
+    Run a download in a running daemon.py and wait for it to finish
+
+    Args:
+        mode: Download type (video, audio, playlist)
+        url: YouTube URL
+        opts: Keyword arguments for the download function
+        socket_path: Unix socket the daemon listens on
+
+    Returns:
+        True if the daemon reported success
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            request = {'mode': mode, 'url': url, 'opts': opts}
+            client.sendall(json.dumps(request).encode() + b"\n")
+            reply = client.makefile('r').readline()
+    except OSError as e:
+        print(f"Error contacting daemon at {socket_path}: {e}", file=sys.stderr)
+        return False
+
+    return bool(reply) and json.loads(reply).get('ok', False)